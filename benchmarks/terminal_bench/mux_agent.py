@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import shlex
+from functools import cache, cached_property
 from pathlib import Path
 from typing import Any, Sequence
 
@@ -14,6 +15,31 @@ from terminal_bench.terminal.tmux_session import TmuxSession
 
 from .mux_payload import build_app_archive, stage_payload
 
+_THINKING_LEVELS = frozenset({"off", "low", "medium", "high"})
+_EXEC_MODES = frozenset({"exec", "execute"})
+
+
+@cache
+def _resolve_paths(repo_root_env: str | None, runner_name: str) -> tuple[Path, Path]:
+    """Resolve and check the repo root and runner once per process.
+
+    Terminal-Bench constructs an agent per task; these paths cannot change
+    mid-run. Failures are not cached, so a missing path is re-checked.
+    """
+    repo_root = (
+        Path(repo_root_env).resolve()
+        if repo_root_env
+        else Path(__file__).resolve().parents[2]
+    )
+    if not repo_root.exists():
+        raise RuntimeError(f"cmux repo root {repo_root} does not exist")
+
+    runner_path = Path(__file__).with_name(runner_name)
+    if not runner_path.is_file():
+        raise RuntimeError(f"cmux runner script missing at {runner_path}")
+
+    return repo_root, runner_path
+
 
 class MuxAgent(AbstractInstalledAgent):
     """
@@ -21,7 +47,19 @@ class MuxAgent(AbstractInstalledAgent):
     forwards the benchmark instruction to the cmux headless runner.
     """
 
-    _ARCHIVE_NAME = "cmux-app.tar.gz"
+    # Terminal-Bench builds one agent per task. The base class still provides a
+    # __dict__ (needed by cached_property), but our own attributes live in slots.
+    __slots__ = (
+        "_runner_path",
+        "_repo_root",
+        "_staged_containers",
+        "_env_cache",
+        "_mode",
+        "_thinking_level",
+        "_model_name",
+    )
+
+    _ARCHIVE_NAME = "mux-app.tar"
     _RUNNER_NAME = "cmux-run.sh"
     _DEFAULT_TRUNK = "main"
     _DEFAULT_MODEL = "anthropic:claude-sonnet-4-5"
@@ -64,6 +102,8 @@ class MuxAgent(AbstractInstalledAgent):
         "CMUX_MODE",
     )
 
+    _ENV_KEYS: Sequence[str] = (*_PROVIDER_ENV_KEYS, *_CONFIG_ENV_KEYS)
+
     def __init__(
         self,
         model_name: str = "anthropic:claude-sonnet-4-5",
@@ -72,23 +112,13 @@ class MuxAgent(AbstractInstalledAgent):
         **kwargs: Any,
     ) -> None:
         super().__init__(**kwargs)
-        repo_root_env = os.environ.get("CMUX_AGENT_REPO_ROOT")
-        repo_root = (
-            Path(repo_root_env).resolve()
-            if repo_root_env
-            else Path(__file__).resolve().parents[2]
+        repo_root, runner_path = _resolve_paths(
+            os.environ.get("CMUX_AGENT_REPO_ROOT"), self._RUNNER_NAME
         )
-        if not repo_root.exists():
-            raise RuntimeError(f"cmux repo root {repo_root} does not exist")
-
-        runner_path = Path(__file__).with_name(self._RUNNER_NAME)
-        if not runner_path.is_file():
-            raise RuntimeError(f"cmux runner script missing at {runner_path}")
-
         self._runner_path = runner_path
         self._repo_root = repo_root
-        self._archive_bytes: bytes | None = None
-        self._staged_container_id: str | None = None
+        self._staged_containers: set[str | None] = set()
+        self._env_cache: dict[str, str] | None = None
         self._mode = mode.lower() if mode else None
         self._thinking_level = thinking_level.lower() if thinking_level else None
         self._model_name = (model_name or "").strip()
@@ -99,12 +129,17 @@ class MuxAgent(AbstractInstalledAgent):
 
     @property
     def _env(self) -> dict[str, str]:
-        env: dict[str, str] = {}
+        # The process environment does not change mid-run, so build this once
+        if self._env_cache is None:
+            self._env_cache = self._build_env()
+        # Hand out a copy so callers can't alter the validated cache
+        return dict(self._env_cache)
+
+    def _invalidate_env_cache(self) -> None:
+        self._env_cache = None
 
-        for key in (*self._PROVIDER_ENV_KEYS, *self._CONFIG_ENV_KEYS):
-            value = os.environ.get(key)
-            if value:
-                env[key] = value
+    def _build_env(self) -> dict[str, str]:
+        env = {key: value for key in self._ENV_KEYS if (value := os.environ.get(key))}
 
         env.setdefault("CMUX_TRUNK", self._DEFAULT_TRUNK)
         env.setdefault("CMUX_MODEL", self._DEFAULT_MODEL)
@@ -119,14 +154,14 @@ class MuxAgent(AbstractInstalledAgent):
         model_value = model_value.strip()
         if not model_value:
             raise ValueError("CMUX_MODEL must be a non-empty string")
-        if "/" in model_value and ":" not in model_value:
-            provider, model_name = model_value.split("/", 1)
-            model_value = f"{provider}:{model_name}"
+        if ":" not in model_value:
+            # Accept provider/model as an alias for provider:model
+            model_value = model_value.replace("/", ":", 1)
         env["CMUX_MODEL"] = model_value
 
         thinking_value = self._thinking_level or env["CMUX_THINKING_LEVEL"]
         normalized_thinking = thinking_value.strip().lower()
-        if normalized_thinking not in {"off", "low", "medium", "high"}:
+        if normalized_thinking not in _THINKING_LEVELS:
             raise ValueError(
                 "CMUX_THINKING_LEVEL must be one of off, low, medium, high"
             )
@@ -134,7 +169,7 @@ class MuxAgent(AbstractInstalledAgent):
 
         mode_value = self._mode or env["CMUX_MODE"]
         normalized_mode = mode_value.strip().lower()
-        if normalized_mode in {"exec", "execute"}:
+        if normalized_mode in _EXEC_MODES:
             env["CMUX_MODE"] = "exec"
         elif normalized_mode == "plan":
             env["CMUX_MODE"] = "plan"
@@ -160,8 +195,9 @@ class MuxAgent(AbstractInstalledAgent):
 
         return env
 
-    @property
+    @cached_property
     def _install_agent_script_path(self) -> Path:
+        # Rendering writes a fresh temp file each call; reuse the first one
         return self._get_templated_script_path("cmux_setup.sh.j2")
 
     def perform_task(
@@ -177,18 +213,13 @@ class MuxAgent(AbstractInstalledAgent):
 
     def _ensure_payload_staged(self, session: TmuxSession) -> None:
         container_id = getattr(session.container, "id", None)
-        if container_id == self._staged_container_id:
+        if container_id in self._staged_containers:
             return
 
-        if not self._archive_bytes:
-            self._archive_bytes = build_app_archive(
-                self._repo_root, self._INCLUDE_PATHS
-            )
-
-        stage_payload(
-            session, self._archive_bytes, self._ARCHIVE_NAME, self._runner_path
-        )
-        self._staged_container_id = container_id
+        # build_app_archive caches by fingerprint, so agents don't pin a copy
+        archive_path = build_app_archive(self._repo_root, self._INCLUDE_PATHS)
+        stage_payload(session, archive_path, self._ARCHIVE_NAME, self._runner_path)
+        self._staged_containers.add(container_id)
 
     def _run_agent_commands(self, instruction: str) -> list[TerminalCommand]:
         escaped = shlex.quote(instruction)
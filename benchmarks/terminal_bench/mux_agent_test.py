@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 
@@ -50,3 +51,43 @@ def test_timeout_must_be_numeric(monkeypatch: pytest.MonkeyPatch) -> None:
     agent = MuxAgent()
     with pytest.raises(ValueError):
         _ = agent._env
+
+
+def test_env_is_cached_until_invalidated(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("CMUX_AGENT_REPO_ROOT", str(_repo_root()))
+    agent = MuxAgent()
+
+    env = agent._env
+    env["CMUX_TRUNK"] = "mutated"
+    assert agent._env["CMUX_TRUNK"] == "main"
+
+    monkeypatch.setenv("CMUX_TRUNK", "develop")
+    assert agent._env["CMUX_TRUNK"] == "main"
+
+    agent._invalidate_env_cache()
+    assert agent._env["CMUX_TRUNK"] == "develop"
+
+
+def test_payload_is_staged_once_per_container(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("CMUX_AGENT_REPO_ROOT", str(_repo_root()))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    agent = MuxAgent()
+    monkeypatch.setattr(agent, "_INCLUDE_PATHS", ("package.json",))
+
+    copies: list[str] = []
+
+    def _session(container_id: str) -> SimpleNamespace:
+        container = SimpleNamespace(
+            id=container_id,
+            exec_run=lambda cmd: None,
+            put_archive=lambda path, data: copies.append(container_id),
+        )
+        return SimpleNamespace(container=container)
+
+    first, second = _session("first"), _session("second")
+    for session in (first, second, first, second):
+        agent._ensure_payload_staged(session)  # type: ignore[arg-type]
+
+    assert copies == ["first", "second"]
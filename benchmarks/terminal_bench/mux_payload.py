@@ -1,43 +1,269 @@
 from __future__ import annotations
 
-import io
+import grp
+import hashlib
+import os
+import pwd
 import tarfile
 import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import cache
 from pathlib import Path
-from typing import Iterable
+from stat import S_IMODE, S_ISDIR, S_ISREG
+from typing import BinaryIO, Iterable, Iterator
 
 from terminal_bench.terminal.tmux_session import TmuxSession
 
+_INSTALL_DIR = "/installed-agent"
 
-def build_app_archive(repo_root: Path, include_paths: Iterable[str]) -> bytes:
-    """Pack the cmux workspace into a gzipped tarball."""
+# Paths of packed archives keyed by a fingerprint of the included files, shared
+# by every agent instance in the process so unchanged trees are only packed
+# once. Only paths are kept; archive contents are streamed from disk.
+_ARCHIVE_CACHE: OrderedDict[str, Path] = OrderedDict()
+_ARCHIVE_CACHE_SIZE = 4
+# Held across lookup, packing and eviction so concurrent trials pack once.
+_ARCHIVE_LOCK = threading.Lock()
+
+# The disk cache keeps the same number of archives; temp files older than this
+# are leftovers from a packer that was killed before os.replace.
+_STALE_TEMP_SECONDS = 60 * 60
+
+# Build and tooling artifacts that the runner never needs inside the container.
+# Hidden directories (.git, .next, ...) are skipped as well.
+_SKIPPED_DIRS = frozenset({"node_modules", "__pycache__"})
+_SKIPPED_FILES = frozenset({".DS_Store"})
+_SKIPPED_SUFFIXES = (".log", ".pyc", ".map")
+
+# Bump whenever _pack_archive changes what it writes, so archives cached on
+# disk by an older version are not reused.
+_ARCHIVE_FORMAT_VERSION = 2
+
+_ArchiveEntry = tuple[str, str, os.stat_result]
+
+
+def _is_skipped_dir(name: str) -> bool:
+    return name in _SKIPPED_DIRS or name.startswith(".")
+
+
+def _is_skipped_file(name: str) -> bool:
+    return name in _SKIPPED_FILES or name.endswith(_SKIPPED_SUFFIXES)
+
+
+def _walk(source: str, arcname: str) -> Iterator[_ArchiveEntry]:
+    """Yield (path, arcname, lstat) under source in sorted order.
+
+    Kept directories are yielded before their contents, as tarfile.add does,
+    so empty directories and directory modes survive.
+    """
+    with os.scandir(source) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        entry_arcname = f"{arcname}/{entry.name}"
+        if entry.is_dir(follow_symlinks=False):
+            if not _is_skipped_dir(entry.name):
+                yield entry.path, entry_arcname, entry.stat(follow_symlinks=False)
+                yield from _walk(entry.path, entry_arcname)
+        elif not _is_skipped_file(entry.name):
+            yield entry.path, entry_arcname, entry.stat(follow_symlinks=False)
+
+
+def _collect_entries(
+    repo_root: Path, include_paths: Iterable[str]
+) -> list[_ArchiveEntry]:
+    entries: list[_ArchiveEntry] = []
+    for relative_path in include_paths:
+        source = repo_root / relative_path
+        if not source.exists():
+            raise FileNotFoundError(f"Required file {source} missing")
+        if source.is_dir():
+            entries.append((str(source), relative_path, source.stat()))
+            entries.extend(_walk(str(source), relative_path))
+        else:
+            entries.append((str(source), relative_path, source.stat()))
+    return entries
+
+
+def _fingerprint(repo_root: Path, entries: Iterable[_ArchiveEntry]) -> str:
+    """Hash path, mode, owner, mtime and size of every entry (not contents).
+
+    Mode and owner are packed into the archive, and chmod/chown do not touch
+    mtime, so they have to be part of the key.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{_ARCHIVE_FORMAT_VERSION}\0{repo_root}\n".encode())
+    for _, arcname, stat in entries:
+        digest.update(
+            f"{arcname}\0{stat.st_mode}\0{stat.st_uid}\0{stat.st_gid}\0"
+            f"{stat.st_mtime_ns}\0{stat.st_size}\n".encode()
+        )
+    return digest.hexdigest()
+
+
+def _disk_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    return (Path(cache_home) if cache_home else Path.home() / ".cache") / "cmux"
+
+
+def _fallback_cache_dir() -> Path:
+    return Path(tempfile.gettempdir()) / f"cmux-{os.getuid()}"
+
+
+@cache
+def _owner_names(uid: int, gid: int) -> tuple[str, str]:
+    """Resolve owner names once per (uid, gid), like tarfile.gettarinfo does."""
+    try:
+        uname = pwd.getpwuid(uid).pw_name
+    except KeyError:
+        uname = ""
+    try:
+        gname = grp.getgrgid(gid).gr_name
+    except KeyError:
+        gname = ""
+    return uname, gname
+
+
+def _tarinfo(arcname: str, stat: os.stat_result) -> tarfile.TarInfo:
+    info = tarfile.TarInfo(arcname)
+    info.mode = S_IMODE(stat.st_mode)
+    info.mtime = int(stat.st_mtime)
+    info.uid = stat.st_uid
+    info.gid = stat.st_gid
+    info.uname, info.gname = _owner_names(stat.st_uid, stat.st_gid)
+    return info
+
+
+def _pack_archive(entries: Iterable[_ArchiveEntry], fileobj: BinaryIO) -> None:
+    # Stream mode writes sequentially, so no seeks and O(block) buffering
+    with tarfile.open(fileobj=fileobj, mode="w|") as archive:
+        for path, arcname, stat in entries:
+            if S_ISDIR(stat.st_mode):
+                info = _tarinfo(arcname, stat)
+                info.type = tarfile.DIRTYPE
+                archive.addfile(info)
+            elif S_ISREG(stat.st_mode):
+                info = _tarinfo(arcname, stat)
+                info.size = stat.st_size
+                with open(path, "rb") as source_file:
+                    archive.addfile(info, source_file)
+            else:
+                # Symlinks and other special files keep tarfile's own handling
+                archive.add(path, arcname=arcname, recursive=False)
+
+
+def _pack_to_disk(entries: Iterable[_ArchiveEntry], cache_path: Path) -> None:
+    """Pack straight into a temp file, then atomically move it into the cache.
+
+    Concurrent processes therefore never observe a partially written archive.
+    """
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=cache_path.parent, suffix=".tmp", delete=False
+    ) as temp_file:
+        temp_path = Path(temp_file.name)
+        try:
+            _pack_archive(entries, temp_file)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+    os.replace(temp_path, cache_path)
+    _prune_disk_cache(cache_path)
+
+
+def _prune_disk_cache(cache_path: Path) -> None:
+    """Keep cache_path and the newest other archives; drop stale temp files.
+
+    Temp files younger than _STALE_TEMP_SECONDS may belong to a concurrent
+    process that is still packing, so they are left alone.
+    """
+    cache_dir = cache_path.parent
+    try:
+        others = sorted(
+            (path for path in cache_dir.glob("archive-*.tar") if path != cache_path),
+            key=lambda path: path.stat().st_mtime_ns,
+            reverse=True,
+        )
+        stale_before = time.time() - _STALE_TEMP_SECONDS
+        stale_temps = [
+            path
+            for path in cache_dir.glob("*.tmp")
+            if path.stat().st_mtime < stale_before
+        ]
+        for path in (*others[_ARCHIVE_CACHE_SIZE - 1 :], *stale_temps):
+            path.unlink(missing_ok=True)
+    except OSError:
+        # Best effort: another process may be pruning the same directory
+        pass
+
+
+def _load_or_pack(entries: Iterable[_ArchiveEntry], archive_name: str) -> Path:
+    cache_path = _disk_cache_dir() / archive_name
+    try:
+        # Refresh mtime so _prune_disk_cache evicts least recently used
+        os.utime(cache_path)
+        return cache_path
+    except OSError:
+        pass
+    try:
+        _pack_to_disk(entries, cache_path)
+        return cache_path
+    except OSError:
+        # Unwritable cache dir: pack into a per-user dir under the temp dir
+        fallback_path = _fallback_cache_dir() / archive_name
+        _pack_to_disk(entries, fallback_path)
+        return fallback_path
+
+
+def build_app_archive(repo_root: Path, include_paths: Iterable[str]) -> Path:
+    """Pack the cmux workspace into an uncompressed tarball and return its path.
+
+    The archive only travels over the local Docker socket, so compression costs
+    CPU without saving meaningful transfer time. Archives are cached under
+    $XDG_CACHE_HOME/cmux so other processes can skip packing too, and callers
+    stream them from there instead of holding the contents in memory.
+    """
     if not repo_root.exists():
         raise FileNotFoundError(f"cmux repo root {repo_root} not found")
 
-    buffer = io.BytesIO()
-    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
-        for relative_path in include_paths:
-            source = repo_root / relative_path
-            if not source.exists():
-                raise FileNotFoundError(f"Required file {source} missing")
-            archive.add(source, arcname=relative_path, recursive=True)
-    return buffer.getvalue()
+    entries = _collect_entries(repo_root, include_paths)
+    key = _fingerprint(repo_root, entries)
+    with _ARCHIVE_LOCK:
+        cached = _ARCHIVE_CACHE.get(key)
+        # Another process may have pruned the file since it was cached
+        if cached is not None and cached.exists():
+            _ARCHIVE_CACHE.move_to_end(key)
+            return cached
+
+        archive_path = _load_or_pack(entries, f"archive-{key}.tar")
+        _ARCHIVE_CACHE[key] = archive_path
+        _ARCHIVE_CACHE.move_to_end(key)
+        while len(_ARCHIVE_CACHE) > _ARCHIVE_CACHE_SIZE:
+            _ARCHIVE_CACHE.popitem(last=False)
+        return archive_path
 
 
 def stage_payload(
     session: TmuxSession,
-    archive_bytes: bytes,
+    archive_path: Path,
     archive_name: str,
     runner_path: Path,
 ) -> None:
-    """Copy the cmux bundle and runner into the task container."""
-    with tempfile.NamedTemporaryFile(suffix=".tar.gz", delete=False) as temp_file:
-        temp_file.write(archive_bytes)
-        temp_path = Path(temp_file.name)
+    """Copy the cmux bundle and runner into the task container.
 
-    try:
-        session.copy_to_container(temp_path, "/installed-agent", archive_name)
-    finally:
-        temp_path.unlink(missing_ok=True)
+    Both files are wrapped in one tar that is streamed to the Docker API from
+    an anonymous temp file, so the archive is never held in memory.
+    """
+    with tempfile.TemporaryFile() as bundle_file:
+        with tarfile.open(fileobj=bundle_file, mode="w|") as bundle:
+            with open(archive_path, "rb") as archive_file:
+                archive_info = tarfile.TarInfo(archive_name)
+                archive_info.size = os.fstat(archive_file.fileno()).st_size
+                archive_info.mtime = int(time.time())
+                bundle.addfile(archive_info, archive_file)
+            bundle.add(runner_path, arcname=runner_path.name)
+        bundle_file.seek(0)
 
-    session.copy_to_container(runner_path, "/installed-agent", runner_path.name)
+        container = session.container
+        container.exec_run(["mkdir", "-p", _INSTALL_DIR])
+        container.put_archive(_INSTALL_DIR, bundle_file)
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import io
+import time
+import os
+import tarfile
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, BinaryIO
+
+import pytest
+
+from . import mux_payload
+from .mux_payload import build_app_archive, stage_payload
+
+
+@pytest.fixture(autouse=True)
+def _isolate_disk_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def _make_repo(root: Path) -> Path:
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "main.ts").write_text("console.log('hi');\n")
+    (root / "package.json").write_text("{}\n")
+    return root
+
+
+def _archive_names(archive_path: Path) -> list[str]:
+    with tarfile.open(archive_path) as archive:
+        return sorted(archive.getnames())
+
+
+def test_archive_is_reused_until_files_change(tmp_path: Path) -> None:
+    repo = _make_repo(tmp_path)
+
+    first = build_app_archive(repo, ("package.json", "src"))
+    assert build_app_archive(repo, ("package.json", "src")) is first
+    assert _archive_names(first) == ["package.json", "src", "src/main.ts"]
+
+    (repo / "src" / "extra.ts").write_text("export {};\n")
+    second = build_app_archive(repo, ("package.json", "src"))
+    assert second is not first
+    assert "src/extra.ts" in _archive_names(second)
+
+    stat = (repo / "package.json").stat()
+    os.utime(repo / "package.json", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert build_app_archive(repo, ("package.json", "src")) is not second
+
+
+def test_archive_is_rebuilt_when_only_the_mode_changes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    repo = _make_repo(tmp_path / "repo")
+    script = repo / "src" / "run.sh"
+    script.write_text("#!/usr/bin/env bash\n")
+    script.chmod(0o644)
+    build_app_archive(repo, ("src",))
+
+    script.chmod(0o755)
+    monkeypatch.setattr(mux_payload, "_ARCHIVE_CACHE", OrderedDict())
+    archive = build_app_archive(repo, ("src",))
+
+    with tarfile.open(archive) as bundle:
+        assert bundle.getmember("src/run.sh").mode == 0o755
+
+
+def test_archive_cache_evicts_least_recently_used(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(mux_payload, "_ARCHIVE_CACHE", OrderedDict())
+    monkeypatch.setattr(mux_payload, "_ARCHIVE_CACHE_SIZE", 1)
+    first_repo = _make_repo(tmp_path / "first")
+    second_repo = _make_repo(tmp_path / "second")
+
+    first = build_app_archive(first_repo, ("src",))
+    second = build_app_archive(second_repo, ("src",))
+
+    assert list(mux_payload._ARCHIVE_CACHE.values()) == [second]
+    assert build_app_archive(first_repo, ("src",)) == first
+    assert list(mux_payload._ARCHIVE_CACHE.values()) == [first]
+
+
+def test_concurrent_builds_pack_the_archive_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(mux_payload, "_ARCHIVE_CACHE", OrderedDict())
+    repo = _make_repo(tmp_path)
+    pack_calls: list[int] = []
+    pack_archive = mux_payload._pack_archive
+
+    def _counting_pack(*args: Any) -> None:
+        pack_calls.append(1)
+        time.sleep(0.05)
+        pack_archive(*args)
+
+    monkeypatch.setattr(mux_payload, "_pack_archive", _counting_pack)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        archives = list(pool.map(lambda _: build_app_archive(repo, ("src",)), range(8)))
+
+    assert len(pack_calls) == 1
+    assert all(archive is archives[0] for archive in archives)
+
+
+def test_archive_is_reused_from_disk_across_processes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    repo = _make_repo(tmp_path / "repo")
+    cached = build_app_archive(repo, ("package.json", "src"))
+    assert cached.parent == tmp_path / "cache" / "cmux"
+    os.utime(cached, (0, 0))
+
+    # A fresh process starts with an empty in-memory cache
+    monkeypatch.setattr(mux_payload, "_ARCHIVE_CACHE", OrderedDict())
+
+    def _fail_pack(*args: Any) -> None:
+        raise AssertionError("archive should come from the disk cache")
+
+    monkeypatch.setattr(mux_payload, "_pack_archive", _fail_pack)
+    assert build_app_archive(repo, ("package.json", "src")) == cached
+    # A hit counts as a use, so pruning evicts least recently used archives
+    assert cached.stat().st_mtime > 0
+
+
+def test_archive_builds_in_memory_when_cache_dir_is_unwritable(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(blocker))
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    repo = _make_repo(tmp_path / "repo")
+
+    archive = build_app_archive(repo, ("package.json", "src"))
+
+    assert archive.is_relative_to(tmp_path / "tmp")
+    assert _archive_names(archive) == ["package.json", "src", "src/main.ts"]
+
+
+def test_disk_cache_keeps_newest_archives_and_drops_stale_temp_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(mux_payload, "_ARCHIVE_CACHE_SIZE", 2)
+    cache_dir = tmp_path / "cache" / "cmux"
+    cache_dir.mkdir(parents=True)
+    stale_temp = cache_dir / "stale.tmp"
+    stale_temp.write_text("")
+    os.utime(stale_temp, (0, 0))
+    fresh_temp = cache_dir / "in-progress.tmp"
+    fresh_temp.write_text("")
+
+    repo = _make_repo(tmp_path / "repo")
+    for index in range(3):
+        (repo / "src" / "main.ts").write_text(f"// {index}\n")
+        os.utime(repo / "src" / "main.ts", ns=(index, index))
+        build_app_archive(repo, ("src",))
+
+    archives = list(cache_dir.glob("archive-*.tar"))
+    assert len(archives) == 2
+    assert not stale_temp.exists()
+    assert fresh_temp.exists()
+
+
+def test_archive_skips_build_artifacts(tmp_path: Path) -> None:
+    repo = _make_repo(tmp_path)
+    (repo / "src" / "node_modules").mkdir()
+    (repo / "src" / "node_modules" / "dep.js").write_text("")
+    (repo / "src" / "debug.log").write_text("")
+    (repo / "src" / ".cache").mkdir()
+    (repo / "src" / ".cache" / "state.json").write_text("{}")
+    (repo / "src" / "main.js.map").write_text("{}")
+    (repo / "src" / ".DS_Store").write_text("")
+
+    names = _archive_names(build_app_archive(repo, ("package.json", "src")))
+
+    assert names == ["package.json", "src", "src/main.ts"]
+
+
+def test_archive_keeps_directories_modes_and_owner(tmp_path: Path) -> None:
+    repo = _make_repo(tmp_path)
+    (repo / "src" / "empty").mkdir()
+    (repo / "src" / "empty").chmod(0o700)
+    (repo / "src" / "main.ts").chmod(0o640)
+
+    archive_path = build_app_archive(repo, ("src",))
+
+    with tarfile.open(archive_path) as archive:
+        members = {member.name: member for member in archive.getmembers()}
+    assert sorted(members) == ["src", "src/empty", "src/main.ts"]
+    assert members["src/empty"].isdir()
+    assert members["src/empty"].mode == 0o700
+    assert members["src/main.ts"].mode == 0o640
+    stat = (repo / "src" / "main.ts").stat()
+    assert (members["src/main.ts"].uid, members["src/main.ts"].gid) == (
+        stat.st_uid,
+        stat.st_gid,
+    )
+    assert (
+        members["src/main.ts"].uname
+        == mux_payload._owner_names(stat.st_uid, stat.st_gid)[0]
+    )
+
+
+class _FakeContainer:
+    def __init__(self) -> None:
+        self.archives: list[tuple[str, bytes]] = []
+
+    def exec_run(self, cmd: Any) -> None:
+        pass
+
+    def put_archive(self, path: str, data: BinaryIO) -> bool:
+        self.archives.append((path, data.read()))
+        return True
+
+
+def test_stage_payload_sends_archive_and_runner_in_one_copy(tmp_path: Path) -> None:
+    runner = tmp_path / "runner.sh"
+    runner.write_text("#!/usr/bin/env bash\n")
+    container = _FakeContainer()
+    session = SimpleNamespace(container=container)
+
+    archive = tmp_path / "archive.tar"
+    archive.write_bytes(b"payload")
+
+    stage_payload(session, archive, "app.tar", runner)  # type: ignore[arg-type]
+
+    assert len(container.archives) == 1
+    path, data = container.archives[0]
+    assert path == "/installed-agent"
+    with tarfile.open(fileobj=io.BytesIO(data)) as bundle:
+        assert sorted(bundle.getnames()) == ["app.tar", "runner.sh"]
+        member = bundle.extractfile("app.tar")
+        assert member is not None and member.read() == b"payload"
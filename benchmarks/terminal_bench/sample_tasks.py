@@ -34,6 +34,13 @@ def sample_tasks(dataset: str, sample_size: int, seed: int | None = None) -> lis
     Returns:
         List of task IDs
     """
+    if sample_size < 0:
+        print(
+            f"Error: sample_size must be non-negative (got {sample_size})",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
     # Parse dataset name and version
     dataset_parts = dataset.split("==")
     dataset_name = dataset_parts[0]
@@ -55,34 +62,42 @@ def sample_tasks(dataset: str, sample_size: int, seed: int | None = None) -> lis
         )
         sys.exit(1)
 
-    # List all task directories
-    try:
-        all_tasks = [
-            d.name
-            for d in dataset_path.iterdir()
-            if d.is_dir() and not d.name.startswith(".")
-        ]
+    # Sample tasks
+    if seed is not None:
+        random.seed(seed)
 
-        if not all_tasks:
+    # Reservoir sampling (Algorithm R): one pass over the dataset listing,
+    # keeping only sample_size task IDs in memory
+    try:
+        reservoir: list[str] = []
+        total_tasks = 0
+        # DirEntry.is_dir() uses the cached d_type, avoiding a stat per entry
+        with os.scandir(dataset_path) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_dir():
+                    continue
+                total_tasks += 1
+                if len(reservoir) < sample_size:
+                    reservoir.append(entry.name)
+                else:
+                    j = random.randrange(total_tasks)
+                    if j < sample_size:
+                        reservoir[j] = entry.name
+
+        if total_tasks == 0:
             print(
                 f"Error: No tasks found in {dataset_path}",
                 file=sys.stderr,
             )
             sys.exit(1)
 
-        # Sample tasks
-        if seed is not None:
-            random.seed(seed)
-
-        if sample_size >= len(all_tasks):
+        if sample_size >= total_tasks:
             print(
-                f"Warning: sample_size ({sample_size}) >= total tasks ({len(all_tasks)}), using all tasks",
+                f"Warning: sample_size ({sample_size}) >= total tasks ({total_tasks}), using all tasks",
                 file=sys.stderr,
             )
-            return all_tasks
 
-        sampled_ids = random.sample(all_tasks, sample_size)
-        return sampled_ids
+        return reservoir
 
     except Exception as e:
         print(f"Error listing tasks from {dataset_path}: {e}", file=sys.stderr)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from . import sample_tasks as sample_tasks_module
+from .sample_tasks import sample_tasks
+
+_DATASET = "terminal-bench-core==0.1.1"
+
+
+@pytest.fixture
+def dataset_tasks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    monkeypatch.setattr(sample_tasks_module, "get_cache_dir", lambda: tmp_path)
+    dataset_path = tmp_path / "terminal-bench-core" / "0.1.1"
+    tasks = [f"task-{index:02d}" for index in range(20)]
+    for task in tasks:
+        (dataset_path / task).mkdir(parents=True)
+    (dataset_path / ".hidden").mkdir()
+    (dataset_path / "README.md").write_text("not a task\n")
+    return tasks
+
+
+def test_same_seed_selects_same_tasks(dataset_tasks: list[str]) -> None:
+    first = sample_tasks(_DATASET, 5, seed=42)
+
+    assert len(first) == 5
+    assert set(first) <= set(dataset_tasks)
+    assert sample_tasks(_DATASET, 5, seed=42) == first
+
+
+def test_sample_size_at_least_total_returns_every_task(
+    dataset_tasks: list[str],
+) -> None:
+    selected = sample_tasks(_DATASET, len(dataset_tasks) + 5, seed=1)
+
+    # Hidden entries and plain files are never counted as tasks
+    assert sorted(selected) == dataset_tasks
+
+
+def test_negative_sample_size_exits(dataset_tasks: list[str]) -> None:
+    with pytest.raises(SystemExit) as excinfo:
+        sample_tasks(_DATASET, -1)
+
+    assert excinfo.value.code == 1